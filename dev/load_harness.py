@@ -0,0 +1,781 @@
+""" Offline load harness for the bot pipeline.
+
+Feeds synthetic or scaled-up recorded Binance payloads through `handler`,
+`generate_user_data`, `TelegramBot.send_summary` and `TelegramBot.send_details`
+without touching the network, and reports latency, peak RSS and telegram
+messages per stage. With `--tracemalloc`, a second pass lists the allocation
+hotspots of each stage. Exits with status 1 when a budget is exceeded.
+
+Usage:
+    # synthetic payloads, 1,000 traders x 200 positions
+    $ python dev/load_harness.py --traders 1000 --positions 200
+
+    # warm container, `handler` invoked 5 times in a row
+    $ python dev/load_harness.py --invocations 5
+
+    # record live payloads once, then replay them scaled up
+    $ python dev/load_harness.py record fixtures.json
+    $ python dev/load_harness.py --replay fixtures.json --traders 1000 --positions 200
+"""
+import argparse
+import copy
+import html
+import json
+import os
+import random
+import re
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+from contextlib import contextmanager
+from typing import Dict, Generator, List, Optional
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT_DIR, os.path.join(ROOT_DIR, "layers", "pybinance", "python")]
+
+# `TelegramBot()` is created at import time and validates the token format.
+os.environ.setdefault("TELEGRAM_BOT_API_KEY", "000000:offline-load-harness")
+os.environ.setdefault("TELEGRAM_CHAT_ID", "0")
+
+from pybinance.utils import helpers  # noqa: E402
+from pybinance.utils.telegram_bot import TelegramBot  # noqa: E402
+from src.handlers.bot import index  # noqa: E402
+
+
+TELEGRAM_MESSAGE_LIMIT = 4096  # max characters per telegram message
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT"]
+PERIODS = ["DAILY", "WEEKLY", "MONTHLY", "ALL"]
+RETAINED_MIN_SIZE = 64 * 1024  # below this, a stage retains nothing worth listing
+PEAK_SNAPSHOT_MIN_SIZE = 64 * 1024  # traced size before the first peak snapshot
+PEAK_SNAPSHOT_GROWTH = 1.25  # snapshot again once traced memory grew by a quarter
+HTML_TAG_PATTERN = re.compile(r"<[^>]*>")
+
+
+def synthetic_rank(i: int, rng: random.Random) -> Dict:
+    """
+    Generate a raw leaderboard rank entry, as returned by `getLeaderboardRank`.
+
+    Args:
+        i (int): Trader index.
+        rng (random.Random): Random generator.
+
+    Returns:
+        rank_data (Dict): Trader raw rank data.
+    """
+    return {
+        "futureUid": None,
+        "nickName": f"trader-{i:05d}",
+        "userPhotoUrl": "",
+        "rank": i + 1,
+        "pnl": round(rng.uniform(-1e5, 1e6), 8),
+        "roi": round(rng.uniform(-1, 5), 8),
+        "positionShared": True,
+        "twitterUrl": None,
+        "encryptedUid": f"{i:032X}",
+        "updateTime": None,
+        "followerCount": rng.randint(0, 10000),
+        "twShared": None,
+        "isTwTrader": False,
+        "openId": None,
+    }
+
+
+def synthetic_performance(rng: random.Random) -> Dict:
+    """
+    Generate a raw performance payload, as returned by `getOtherPerformance`.
+
+    Args:
+        rng (random.Random): Random generator.
+
+    Returns:
+        performance_data (Dict): Trader raw performance data.
+    """
+    return {
+        "performanceRetList": [
+            {
+                "periodType": period,
+                "statisticsType": statistics,
+                "value": rng.uniform(-1, 5)
+                if statistics == "ROI"
+                else rng.uniform(-1e5, 1e6),
+                "rank": 0,
+            }
+            for period in PERIODS
+            for statistics in ("ROI", "PNL")
+        ],
+        "lastTradeTime": int(time.time() * 1000),
+    }
+
+
+def synthetic_position(rng: random.Random) -> Dict:
+    """
+    Generate a raw position entry, as listed in `getOtherPosition`.
+
+    Args:
+        rng (random.Random): Random generator.
+
+    Returns:
+        position (Dict): Raw position data.
+    """
+    entry_price = rng.uniform(0.01, 50000)
+    return {
+        "symbol": rng.choice(SYMBOLS),
+        "entryPrice": entry_price,
+        "markPrice": entry_price * rng.uniform(0.9, 1.1),
+        "pnl": rng.uniform(-1e4, 1e4),
+        "roe": rng.uniform(-1, 1),
+        "updateTime": [2022, 11, 20, 12, 0, 0, 0],
+        "amount": rng.choice([-1, 1]) * rng.uniform(0.001, 1000),
+        "updateTimeStamp": int(time.time() * 1000),
+        "yellow": False,
+        "tradeBefore": False,
+        "leverage": rng.randint(1, 125),
+    }
+
+
+def build_payloads(
+    traders: int,
+    positions: int,
+    replay: Optional[Dict] = None,
+    seed: int = 0,
+) -> Dict:
+    """
+    Build raw payloads for `traders` traders holding `positions` positions each.
+
+    Recorded payloads are cycled through and given fresh uids, so a handful of
+    real traders can be scaled up; anything missing is filled synthetically.
+
+    Args:
+        traders (int): Number of traders.
+        positions (int): Number of positions per trader.
+        replay (Dict): Recorded payloads, as written by `record`.
+        seed (int): Random seed for synthetic data.
+
+    Returns:
+        payloads (Dict): Raw rank list and performance/positions data by uid.
+    """
+    rng = random.Random(seed)
+    replay = replay or {}
+    recorded_rank = replay.get("rank") or []
+    recorded_performance = replay.get("performance") or {}
+    recorded_positions = replay.get("positions") or {}
+
+    payloads = {"rank": [], "performance": {}, "positions": {}}
+    for i in range(traders):
+        if recorded_rank:
+            source = recorded_rank[i % len(recorded_rank)]
+            rank_data = copy.deepcopy(source)
+            rank_data.update(rank=i + 1, encryptedUid=f"{i:032X}")
+        else:
+            source = {}
+            rank_data = synthetic_rank(i, rng)
+        uid = rank_data["encryptedUid"]
+
+        performance_data = recorded_performance.get(source.get("encryptedUid"))
+        if not performance_data:
+            performance_data = synthetic_performance(rng)
+
+        positions_data = recorded_positions.get(source.get("encryptedUid")) or {}
+        position_list = positions_data.get("otherPositionRetList") or []
+        payloads["rank"].append(rank_data)
+        payloads["performance"][uid] = performance_data
+        payloads["positions"][uid] = {
+            "otherPositionRetList": [
+                position_list[j % len(position_list)]
+                if position_list
+                else synthetic_position(rng)
+                for j in range(positions)
+            ],
+            "updateTime": positions_data.get("updateTime"),
+            "updateTimeStamp": positions_data.get("updateTimeStamp")
+            or int(time.time() * 1000),
+        }
+
+    return payloads
+
+
+def record(path: str) -> None:
+    """
+    Record live payloads from Binance to be replayed later.
+
+    Args:
+        path (str): Output json file.
+
+    Returns:
+        None
+    """
+    rank = helpers.get_leader_board_rank() or []
+    uids = helpers.get_encrypted_uids(rank)
+    recorded = {
+        "rank": rank,
+        "performance": {uid: helpers.get_trader_performance(uid) for uid in uids},
+        "positions": {uid: helpers.get_trader_positions(uid) for uid in uids},
+    }
+    with open(path, "w") as f:
+        json.dump(recorded, f, indent=2)
+
+    print(f"Recorded {len(rank)} traders to {path}")
+
+
+class FakeResponse:
+    """Stand-in for `requests.Response`, decoding the body on every `json()`."""
+
+    def __init__(self, body: bytes) -> None:
+        self.status_code = 200
+        self._body = body
+
+    def json(self) -> Dict:
+        return json.loads(self._body)
+
+
+class FakeBinance:
+    """Serves the Binance endpoints used by `helpers` from encoded payloads."""
+
+    def __init__(self, payloads: Dict) -> None:
+        self.rank_body = self._encode(payloads["rank"])
+        self.bodies = {
+            "getOtherPerformance": {
+                uid: self._encode(data)
+                for uid, data in payloads["performance"].items()
+            },
+            "getOtherPosition": {
+                uid: self._encode(data) for uid, data in payloads["positions"].items()
+            },
+        }
+
+    @staticmethod
+    def _encode(data) -> bytes:
+        return json.dumps({"code": "000000", "data": data}).encode()
+
+    def post(self, url: str, **kwargs) -> FakeResponse:
+        endpoint = url.rsplit("/", 1)[-1]
+        if endpoint == "getLeaderboardRank":
+            return FakeResponse(self.rank_body)
+        return FakeResponse(self.bodies[endpoint][kwargs["json"]["encryptedUid"]])
+
+    def get_leader_board_rank(self) -> List[Dict]:
+        # the real one only keeps the top 10, serve every trader instead
+        return FakeResponse(self.rank_body).json().get("data")
+
+
+def telegram_length(text: str) -> int:
+    """
+    Get the length of a message as telegram counts it against its limit.
+
+    Telegram parses `ParseMode.HTML` first, so tags do not count and entities
+    count as the character they stand for, then counts UTF-16 code units.
+
+    Args:
+        text (str): HTML message.
+
+    Returns:
+        length (int): Message length.
+    """
+    text = html.unescape(HTML_TAG_PATTERN.sub("", text))
+    return len(text.encode("utf-16-le")) // 2
+
+
+class FakeTelegram:
+    """Swallows telegram messages, keeping count of what would have been sent."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.messages = 0
+        self.characters = 0
+        self.oversized = 0
+        self.seconds = 0.0  # spent counting, left out of the stage latency
+
+    def send_message(self, chat_id, text: str, **_) -> None:
+        start = time.perf_counter()
+        length = telegram_length(text)
+        self.messages += 1
+        self.characters += length
+        if length > TELEGRAM_MESSAGE_LIMIT:
+            self.oversized += 1
+        self.seconds += time.perf_counter() - start
+
+
+class RSSSampler(threading.Thread):
+    """
+    Polls the process resident set size to catch the peak of a stage.
+
+    When tracemalloc is tracing, also snapshots the traced allocations every
+    time they grow by `PEAK_SNAPSHOT_GROWTH`, so the last one is near the peak.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.baseline = self.peak = current_rss()
+        self.tracing = tracemalloc.is_tracing()
+        self.peak_snapshot = None
+        self._snapshot_size = PEAK_SNAPSHOT_MIN_SIZE
+        self._stop_event = threading.Event()
+
+    def sample(self) -> None:
+        self.peak = max(self.peak, current_rss())
+        if self.tracing:
+            traced = tracemalloc.get_traced_memory()[0]
+            if traced >= self._snapshot_size:
+                self.peak_snapshot = take_snapshot()
+                self._snapshot_size = traced * PEAK_SNAPSHOT_GROWTH
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        self.sample()
+        return self.peak
+
+
+def current_rss() -> int:
+    """
+    Get the current resident set size of the process.
+
+    Falls back to the lifetime peak where `/proc` is not available.
+
+    Returns:
+        rss (int): Resident set size in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    """
+    Take a tracemalloc snapshot, leaving out the harness own allocations.
+
+    Returns:
+        snapshot (tracemalloc.Snapshot): Filtered snapshot.
+    """
+    return tracemalloc.take_snapshot().filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, threading.__file__),
+            tracemalloc.Filter(False, "*/_weakrefset.py"),
+            tracemalloc.Filter(False, __file__),
+        ]
+    )
+
+
+def to_mb(size: int) -> float:
+    return round(size / 2**20, 1)
+
+
+def hotspots(snapshot: Optional[tracemalloc.Snapshot], top: int) -> List[Dict]:
+    """
+    List the lines holding the most memory in a snapshot.
+
+    Args:
+        snapshot (tracemalloc.Snapshot): Snapshot, if any.
+        top (int): Number of lines to keep.
+
+    Returns:
+        hotspots (List): Location, size and number of blocks of each line.
+    """
+    if snapshot is None:
+        return []
+    return [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:top]
+    ]
+
+
+@contextmanager
+def measure(
+    stage: str, results: List, telegram: FakeTelegram, top: int = 10
+) -> Generator:
+    """
+    Measure latency, peak RSS and telegram messages of the wrapped block.
+
+    When tracemalloc is tracing, only the block own allocations are traced,
+    and the lines holding them are recorded near the traced peak and once the
+    block is done. A failing block is reported with its error instead of
+    being raised.
+
+    Args:
+        stage (str): Stage name.
+        results (List): List to append the stage measurements to.
+        telegram (FakeTelegram): Fake telegram client used by the block.
+        top (int): Number of allocation hotspots to keep.
+
+    Returns:
+        Generator: Context manager.
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+    telegram.reset()
+    stage_result = {"stage": stage, "error": None}
+    sampler = RSSSampler()
+    sampler.start()
+    start = time.perf_counter()
+
+    try:
+        yield
+    except Exception as e:
+        traceback.print_exc()
+        stage_result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        elapsed = time.perf_counter() - start
+        peak_rss = sampler.stop()
+        stage_result.update(
+            seconds=round(elapsed - telegram.seconds, 3),
+            baseline_rss_mb=to_mb(sampler.baseline),
+            peak_rss_mb=to_mb(peak_rss),
+            delta_rss_mb=to_mb(peak_rss - sampler.baseline),
+            messages=telegram.messages,
+            characters=telegram.characters,
+            oversized=telegram.oversized,
+            peak_traced_mb=None,
+            peak_hotspots=[],
+            retained_hotspots=[],
+        )
+        if tracing:
+            retained = take_snapshot()
+            stage_result.update(
+                peak_traced_mb=to_mb(tracemalloc.get_traced_memory()[1]),
+                peak_hotspots=hotspots(sampler.peak_snapshot, top),
+            )
+            # temporaries only (e.g. message strings) leave nothing worth listing
+            if sum(trace.size for trace in retained.traces) >= RETAINED_MIN_SIZE:
+                stage_result["retained_hotspots"] = hotspots(retained, top)
+        results.append(stage_result)
+
+
+def run_pass(
+    binance: FakeBinance, telegram: FakeTelegram, invocations: int, top: int = 10
+) -> List[Dict]:
+    """
+    Run every stage of the pipeline once, on a cold container.
+
+    `handler` goes first, from a clean heap, and is invoked `invocations`
+    times without resetting the module state, as a warm lambda container would.
+
+    Args:
+        binance (FakeBinance): Fake Binance API serving the payloads.
+        telegram (FakeTelegram): Fake telegram client used by the bot.
+        invocations (int): Number of consecutive `handler` invocations.
+        top (int): Number of allocation hotspots to keep per stage.
+
+    Returns:
+        stages (List): Stage measurements.
+    """
+    # a new pass is a new container, `users_data` lives as long as the module
+    index.users_data.clear()
+    stages = []
+
+    for invocation in range(1, invocations + 1):
+        with measure(f"handler #{invocation}", stages, telegram, top):
+            index.handler({}, None)
+        stages[-1]["users_data"] = len(index.users_data)
+
+    rank_raw_data = binance.get_leader_board_rank()
+    raw_data = [
+        (
+            helpers.get_trader_performance(uid),
+            helpers.get_trader_positions(uid),
+        )
+        for uid in helpers.get_encrypted_uids(rank_raw_data)
+    ]
+
+    users_data = []
+    with measure("generate_user_data", stages, telegram, top):
+        users_data = [
+            helpers.generate_user_data(
+                i + 1, rank_data, performance_data, positions_data
+            )
+            for i, (rank_data, (performance_data, positions_data)) in enumerate(
+                zip(rank_raw_data, raw_data)
+            )
+        ]
+    del rank_raw_data, raw_data
+    results = {"data": users_data, "datetime": "offline"}
+
+    bot = TelegramBot()
+    bot.bot_client = telegram
+    with measure("send_summary", stages, telegram, top):
+        bot.send_summary(results)
+
+    with measure("send_details", stages, telegram, top):
+        bot.send_details(results)
+
+    return stages
+
+
+def run(
+    binance: FakeBinance,
+    import_rss: int,
+    invocations: int = 1,
+    top: int = 10,
+    trace: bool = False,
+) -> Dict:
+    """
+    Run every stage of the pipeline against the given fake Binance API.
+
+    Latency and RSS come from an untraced pass; allocation hotspots come from
+    an optional second pass under tracemalloc, which inflates both.
+
+    Args:
+        binance (FakeBinance): Fake Binance API serving the payloads.
+        import_rss (int): Process RSS once the bot modules are imported.
+        invocations (int): Number of consecutive `handler` invocations.
+        top (int): Number of allocation hotspots to keep per stage.
+        trace (bool): Run the traced pass.
+
+    Returns:
+        report (Dict): Stage measurements.
+    """
+    telegram = FakeTelegram()
+    helpers.requests.post = binance.post
+    helpers.telegram_bot_client.bot_client = telegram
+    index.Telegram_bot_client.bot_client = telegram
+    index.get_leader_board_rank = binance.get_leader_board_rank
+
+    baseline_rss = current_rss()
+    stages = run_pass(binance, telegram, invocations)
+    # what the lambda would hold: the runtime and modules plus everything the
+    # pipeline holds up to that stage; whatever earlier `handler` invocations
+    # left behind, and the `users_data` the telegram stages work on
+    handler_rss_mb = stages[0]["baseline_rss_mb"]
+    pipeline_rss_mb = stages[invocations]["baseline_rss_mb"]
+    for stage in stages:
+        if stage["stage"].startswith("handler"):
+            used_rss_mb = stage["peak_rss_mb"] - handler_rss_mb
+        else:
+            used_rss_mb = stage["peak_rss_mb"] - pipeline_rss_mb
+        stage["lambda_rss_mb"] = round(to_mb(import_rss) + used_rss_mb, 1)
+
+    if trace:
+        tracemalloc.start()
+        try:
+            traced_stages = run_pass(binance, telegram, invocations, top)
+        finally:
+            tracemalloc.stop()
+        for stage, traced_stage in zip(stages, traced_stages):
+            stage.update(
+                peak_traced_mb=traced_stage["peak_traced_mb"],
+                peak_hotspots=traced_stage["peak_hotspots"],
+                retained_hotspots=traced_stage["retained_hotspots"],
+            )
+
+    return {
+        "stages": stages,
+        "import_rss_mb": to_mb(import_rss),
+        "baseline_rss_mb": to_mb(baseline_rss),
+    }
+
+
+def check_budgets(
+    report: Dict,
+    rss_budget_mb: float,
+    latency_budget_s: float,
+    oversized_budget: int = 0,
+) -> List[str]:
+    """
+    Check each stage of the report against the budgets.
+
+    Args:
+        report (Dict): Report, as returned by `run`.
+        rss_budget_mb (float): Max estimated lambda RSS per stage, in MB.
+        latency_budget_s (float): Max latency per stage, in seconds.
+        oversized_budget (int): Max messages over the telegram limit per stage.
+
+    Consecutive `handler` invocations keeping or re-sending earlier data are
+    reported as well.
+
+    Returns:
+        violations (List): List of exceeded budgets.
+    """
+    violations = []
+    handler_stages = [
+        stage for stage in report["stages"] if stage["stage"].startswith("handler")
+    ]
+    for previous, stage in zip(handler_stages, handler_stages[1:]):
+        # a warm container should not keep nor re-send earlier invocations data
+        if (
+            stage["users_data"] > previous["users_data"]
+            or stage["messages"] > previous["messages"]
+        ):
+            violations.append(
+                f"{stage['stage']}: state kept from earlier invocations,"
+                f" `users_data` grew from {previous['users_data']}"
+                f" to {stage['users_data']} entries and messages sent"
+                f" from {previous['messages']} to {stage['messages']}"
+            )
+
+    for stage in report["stages"]:
+        name = stage["stage"]
+        if stage["error"]:
+            violations.append(f"{name}: failed with {stage['error']}")
+        if stage["lambda_rss_mb"] > rss_budget_mb:
+            violations.append(
+                f"{name}: estimated lambda RSS {stage['lambda_rss_mb']}MB"
+                f" > {rss_budget_mb}MB"
+            )
+        if stage["seconds"] > latency_budget_s:
+            violations.append(f"{name}: {stage['seconds']}s > {latency_budget_s}s")
+        if stage["oversized"] > oversized_budget:
+            violations.append(
+                f"{name}: {stage['oversized']} messages over"
+                f" {TELEGRAM_MESSAGE_LIMIT} characters, telegram would reject them"
+            )
+    return violations
+
+
+def print_report(report: Dict) -> None:
+    """
+    Print a human readable report.
+
+    Args:
+        report (Dict): Report, as returned by `run`.
+
+    Returns:
+        None
+    """
+    print(
+        f"{'stage':<20}{'seconds':>9}{'RSS +MB':>9}{'lambda MB':>11}"
+        f"{'process MB':>12}{'traced MB':>11}{'messages':>10}{'oversized':>11}"
+    )
+    for stage in report["stages"]:
+        traced = stage["peak_traced_mb"]
+        print(
+            f"{stage['stage']:<20}{stage['seconds']:>9}{stage['delta_rss_mb']:>9}"
+            f"{stage['lambda_rss_mb']:>11}{stage['peak_rss_mb']:>12}"
+            f"{'-' if traced is None else traced:>11}"
+            f"{stage['messages']:>10}{stage['oversized']:>11}"
+        )
+
+    for stage in report["stages"]:
+        for title, key in (
+            ("Allocations near the traced peak", "peak_hotspots"),
+            ("Retained allocations", "retained_hotspots"),
+        ):
+            if stage[key]:
+                print(f"\n{title} - {stage['stage']}:")
+            for hotspot in stage[key]:
+                print(
+                    f"  {hotspot['size_kb']:>10} KB {hotspot['count']:>8} blocks"
+                    f"  {hotspot['location']}"
+                )
+
+    print(
+        f"\nRSS after imports: {report['import_rss_mb']}MB - "
+        f"with harness and payloads: {report['baseline_rss_mb']}MB"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traders", type=int, default=1000)
+    parser.add_argument("--positions", type=int, default=200)
+    parser.add_argument("--replay", help="recorded payloads to scale up")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--invocations",
+        type=int,
+        default=1,
+        help="consecutive `handler` invocations on the same warm container",
+    )
+    parser.add_argument(
+        "--rss-budget-mb",
+        type=float,
+        default=1024,
+        help="max estimated lambda RSS per stage, match `memorySize` in serverless.yml",
+    )
+    parser.add_argument(
+        "--latency-budget-s",
+        type=float,
+        default=60,
+        help="max seconds per stage, match `timeout` in serverless.yml",
+    )
+    parser.add_argument(
+        "--oversized-budget",
+        type=int,
+        default=0,
+        help=f"max messages over {TELEGRAM_MESSAGE_LIMIT} characters per stage,"
+        " counted as telegram does",
+    )
+    parser.add_argument("--top", type=int, default=10, help="hotspots per stage")
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="add a traced pass collecting allocation hotspots, much slower",
+    )
+    parser.add_argument("--json", help="also write the report to this json file")
+    parser.add_argument("--verbose", action="store_true", help="keep bot logs")
+
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    record_parser = subparsers.add_parser(
+        "record", help="record live payloads from Binance to replay later"
+    )
+    record_parser.add_argument("path", help="json file to write the payloads to")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        record(args.path)
+        return 0
+
+    if not args.verbose:
+        for logger in (index.logger, helpers.logger):
+            logger.setLevel("WARNING")
+
+    import_rss = current_rss()
+    replay = None
+    if args.replay:
+        with open(args.replay) as f:
+            replay = json.load(f)
+    binance = FakeBinance(
+        build_payloads(args.traders, args.positions, replay, args.seed)
+    )
+
+    report = run(
+        binance,
+        import_rss,
+        invocations=args.invocations,
+        top=args.top,
+        trace=args.tracemalloc,
+    )
+    report.update(
+        traders=args.traders,
+        positions=args.positions,
+        invocations=args.invocations,
+        replay=args.replay,
+        rss_budget_mb=args.rss_budget_mb,
+        latency_budget_s=args.latency_budget_s,
+        oversized_budget=args.oversized_budget,
+    )
+    report["violations"] = check_budgets(
+        report, args.rss_budget_mb, args.latency_budget_s, args.oversized_budget
+    )
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    for violation in report["violations"]:
+        print(f"Budget exceeded - {violation}", file=sys.stderr)
+    return 1 if report["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())